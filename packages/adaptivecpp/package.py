@@ -3,9 +3,10 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-import json
+import os
+from collections import deque
+from functools import lru_cache
 from os import path
-from glob import glob
 
 from llnl.util import filesystem
 
@@ -21,6 +22,161 @@ Install nvc++ version with something like
 to avoid llvm build
 """
 
+# Keys of the compiler driver configuration edited by filter_config_file
+_CUDA_LINK_LINE = "default-cuda-link-line"
+_OMP_LINK_LINE = "default-omp-link-line"
+_DEFAULT_TARGETS = "default-targets"
+# Default target when there is no llvm to build accelerated backends with
+_LIBRARY_ONLY_TARGET = "omp.library-only"
+
+_NVCXX_LLVM_CONFLICT = (
+    "Cannot use nvc++ and llvm backends simultaneously."
+    " Choose one of +nvcxx or +cuda +omp_llvm."
+)
+
+# Directories under <prefix>/etc that the driver config files are installed
+# to, depending on the release naming of the project
+_CONFIG_DIRS = ("AdaptiveCpp", "OpenSYCL", "hipSYCL")
+
+# Files looked up under the llvm prefix by cmake_args and filter_config_file
+_LLVM_FILES = frozenset(
+    (
+        "LLVMExports.cmake",
+        "__clang_cuda_runtime_wrapper.h",
+        "libc++.so",
+        "libc++abi.so",
+        "libomp.so",
+    )
+)
+
+
+def _probe_config_file(prefix, names):
+    """Return the first driver config file called one of names in the
+    directories AdaptiveCpp installs its configuration to, or None."""
+    for config_dir in _CONFIG_DIRS:
+        for name in names:
+            candidate = path.join(prefix, "etc", config_dir, name)
+            if path.isfile(candidate):
+                return candidate
+    return None
+
+
+def _rpath_flags(rpaths, flag):
+    """Return the flags adding each of rpaths with the given rpath flag,
+    formatted for appending to a driver link line."""
+    return "".join(f" {flag} {p}" for p in rpaths)
+
+
+# The helpers from here to the package class are also imported by the
+# hipsycl package, so keep them free of AdaptiveCpp specifics.
+
+# Large subtrees of an nvhpc install that never contain the nvc++ driver
+_NVHPC_SKIP_DIRS = frozenset(("math_libs", "examples", "profilers", "cuda"))
+
+
+def _scandir_find(root, names):
+    """Yield (directory, name) for the files below root whose name is in
+    names. The tree is walked depth first with os.scandir, which reports
+    file types without an extra stat per entry; links to directories are
+    not followed. Directories that can not be read are skipped."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name in names:
+                        yield directory, entry.name
+        except OSError:
+            # Skip directories that can not be read, as os.walk does
+            continue
+
+
+def _find_many(root, names):
+    """Map each of names to the directories below root that contain a file
+    with that name, walking the tree only once."""
+    found = {name: [] for name in names}
+    for directory, name in _scandir_find(root, names):
+        found[name].append(directory)
+    return found
+
+
+def _find_first(root, name, skip=frozenset()):
+    """Breadth-first search below root for a file called name, without
+    descending into directories whose name is in skip. Returns the
+    shallowest match, or None if there is no such file."""
+    queue = deque([root])
+    while queue:
+        try:
+            with os.scandir(queue.popleft()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip:
+                            queue.append(entry.path)
+                    elif entry.name == name:
+                        return entry.path
+        except OSError:
+            # Skip directories that can not be read, as os.walk does
+            continue
+    return None
+
+
+def _find_nvcpp(nvhpc_prefix):
+    """Return the path of the nvc++ executable in an nvhpc install, or None.
+    nvc++ normally lives at <arch>/<version>/compilers/bin/nvc++, so that is
+    checked before searching the rest of the (very large) tree."""
+    from glob import glob
+
+    for candidate in glob(
+        path.join(nvhpc_prefix, "Linux_*", "[0-9]*", "compilers", "bin", "nvc++")
+    ):
+        if os.access(candidate, os.X_OK):
+            return candidate
+    return _find_first(nvhpc_prefix, "nvc++", _NVHPC_SKIP_DIRS)
+
+
+@lru_cache(maxsize=None)
+def _orjson():
+    """Return the orjson module, or None if it is not installed. The JSON
+    modules are only needed by the install hook, so they are imported on
+    first use rather than every time Spack loads this package."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def _load_config(config_path):
+    """Read a SYCL compiler driver configuration file. Uses orjson when it
+    is available and falls back to the json module otherwise."""
+    orjson = _orjson()
+    with open(config_path, "rb") as f:
+        if orjson is not None:
+            return orjson.loads(f.read())
+        import json
+
+        return json.load(f)
+
+
+def _write_config(config, config_path):
+    """Write a SYCL compiler driver configuration file. The new contents go
+    to a temporary file that then replaces the original, so an interrupted
+    install never leaves a truncated config behind."""
+    tmp_path = config_path + ".tmp"
+    orjson = _orjson()
+    if orjson is not None:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+    else:
+        import json
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, config_path)
+
 
 class Adaptivecpp(CMakePackage):
     """AdaptiveCPP is an implementation of the SYCL standard programming model
@@ -31,6 +187,9 @@ class Adaptivecpp(CMakePackage):
 
     provides("sycl")
 
+    # Ninja schedules AdaptiveCpp's many translation units better than make
+    generator("ninja")
+
     version(
         "24.06.0",
         commit="fc51dae9006d6858fc9c33148cc5f935bb56b075",
@@ -69,7 +228,6 @@ class Adaptivecpp(CMakePackage):
     )
 
     depends_on("cmake@3.5:", type="build")
-    depends_on("boost +filesystem", when="@23.10.0:")
     depends_on(
         "boost@1.60.0: +filesystem +fiber +context cxxstd=17", when="@23.10.0:"
     )
@@ -108,22 +266,51 @@ class Adaptivecpp(CMakePackage):
     # If we build against llvm then nvc++ ends up trying to use the linker
     # packaged with llvm and this ends up as a mess. Users should either do
     # +cuda +omp_llvm or +nvcxx and not both within the same installation.
-    conflicts(
-        "+nvcxx",
-        when="+cuda",
-        msg="Cannot use nvc++ and llvm backends simultaneously."
-        "Choose one of +nvcxx or +cuda +omp_llvm.",
-    )
-    conflicts(
-        "+nvcxx",
-        when="+omp_llvm",
-        msg="Cannot use nvc++ and llvm backends simultaneously."
-        " Choose one of +nvcxx or +cuda +omp_llvm.",
-    )
+    for llvm_variant in ("+cuda", "+omp_llvm"):
+        conflicts("+nvcxx", when=llvm_variant, msg=_NVCXX_LLVM_CONFLICT)
+
+    @property
+    def _llvm_index(self):
+        """Map each of the files in _LLVM_FILES to the directories under the
+        llvm prefix that contain it.
+
+        The llvm install tree is large, so it is walked once and the result
+        is shared by cmake_args and filter_config_file.
+        """
+        if getattr(self, "_llvm_index_cache", None) is None:
+            self._llvm_index_cache = _find_many(self.spec["llvm"].prefix, _LLVM_FILES)
+        return self._llvm_index_cache
+
+    @property
+    def _nvcpp(self):
+        """Path of the nvc++ executable in the nvhpc dependency. Cached, as
+        cmake_args may be called more than once per install."""
+        if getattr(self, "_nvcpp_cache", None) is None:
+            nvcpp = _find_nvcpp(self.spec["nvhpc"].prefix)
+            if nvcpp is None:
+                raise InstallError("Failed to find nvc++ executable")
+            self._nvcpp_cache = nvcpp
+        return self._nvcpp_cache
+
+    def _find_unique_llvm_dir(self, name, description):
+        """Return the only directory under the llvm prefix containing a file
+        called name, raising an InstallError if there is not exactly one."""
+        found = self._llvm_index.get(name, [])
+        if len(found) != 1:
+            raise InstallError(
+                "concretized llvm dependency must provide a unique {0}, "
+                "found: {1}".format(description, found)
+            )
+        return found[0]
 
     def cmake_args(self):
 
         spec = self.spec
+        has_llvm = "llvm" in spec
+        want_cuda = "+cuda" in spec
+        want_nvcxx = "+nvcxx" in spec
+        want_opencl = "+opencl" in spec
+
         args = [
             "-DACPP_VERSION_SUFFIX=spack",
             "-DWITH_CPU_BACKEND:Bool=TRUE",
@@ -132,7 +319,9 @@ class Adaptivecpp(CMakePackage):
             "-DWITH_STDPAR_COMPILER:Bool=FALSE",
         ]
 
-        if "llvm" in spec:
+        if has_llvm:
+            llvm_prefix = spec["llvm"].prefix
+
             # prevent AdaptiveCPP's cmake to look for other LLVM installations
             # if the specified one isn't compatible
             args += [
@@ -141,35 +330,20 @@ class Adaptivecpp(CMakePackage):
 
             # LLVM directory containing all installed CMake files
             # (e.g.: configs consumed by client projects)
-            llvm_cmake_dirs = filesystem.find(
-                spec["llvm"].prefix, "LLVMExports.cmake"
-            )
-            if len(llvm_cmake_dirs) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide "
-                    "a unique directory containing CMake client "
-                    "files, found: {0}".format(llvm_cmake_dirs)
-                )
-            args.append(
-                "-DLLVM_DIR:String={0}".format(path.dirname(llvm_cmake_dirs[0]))
+            llvm_cmake_dir = self._find_unique_llvm_dir(
+                "LLVMExports.cmake", "directory containing CMake client files"
             )
+            args.append("-DLLVM_DIR:String={0}".format(llvm_cmake_dir))
             # clang internal headers directory
-            llvm_clang_include_dirs = filesystem.find(
-                spec["llvm"].prefix, "__clang_cuda_runtime_wrapper.h"
+            llvm_clang_include_dir = self._find_unique_llvm_dir(
+                "__clang_cuda_runtime_wrapper.h",
+                "directory containing clang internal headers",
             )
-            if len(llvm_clang_include_dirs) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide a "
-                    "unique directory containing clang internal "
-                    "headers, found: {0}".format(llvm_clang_include_dirs)
-                )
             args.append(
-                "-DCLANG_INCLUDE_PATH:String={0}".format(
-                    path.dirname(llvm_clang_include_dirs[0])
-                )
+                "-DCLANG_INCLUDE_PATH:String={0}".format(llvm_clang_include_dir)
             )
             # target clang++ executable
-            llvm_clang_bin = path.join(spec["llvm"].prefix.bin, "clang++")
+            llvm_clang_bin = path.join(llvm_prefix, "bin", "clang++")
             if not filesystem.is_exe(llvm_clang_bin):
                 raise InstallError(
                     "concretized llvm dependency must provide a "
@@ -180,7 +354,7 @@ class Adaptivecpp(CMakePackage):
                 "-DCLANG_EXECUTABLE_PATH:String={0}".format(llvm_clang_bin)
             )
 
-        if ("+cuda" in spec) or ("+nvcxx" in spec):
+        if want_cuda or want_nvcxx:
             args += [
                 "-DCUDA_TOOLKIT_ROOT_DIR:String={0}".format(
                     spec["cuda"].prefix
@@ -193,24 +367,19 @@ class Adaptivecpp(CMakePackage):
                 "-DDISABLE_FIND_PACKAGE_CUDA=TRUE",
             ]
 
-        if "+nvcxx" in spec:
-            nvcpp_cands = glob(
-                path.join(spec["nvhpc"].prefix, "**/nvc++"), recursive=True
-            )
-            if len(nvcpp_cands) < 1:
-                raise InstallError("Failed to find nvc++ executable")
-            args.append("-DNVCXX_COMPILER={0}".format(nvcpp_cands[0]))
+        if want_nvcxx:
+            args.append("-DNVCXX_COMPILER={0}".format(self._nvcpp))
 
-            if not ("llvm" in spec):
+            if not has_llvm:
                 args.append("-DWITH_CUDA_NVCXX_ONLY=ON")
 
-        if not ("llvm" in spec):
+        if not has_llvm:
             args += [
                 "-DWITH_ACCELERATED_CPU=OFF",
                 "-DBUILD_CLANG_PLUGIN=OFF",
             ]
 
-        if "+opencl" in spec:
+        if want_opencl:
             args += [
                 "-DWITH_SSCP_COMPILER:Bool=TRUE",
                 "-DWITH_OPENCL_BACKEND=ON",
@@ -226,29 +395,49 @@ class Adaptivecpp(CMakePackage):
     @run_after("install")
     def filter_config_file(self):
 
+        spec = self.spec
+        has_llvm = "llvm" in spec
+        want_cuda = "+cuda" in spec
+
         # The config file name and location depends on version:
         # pre-24.02.0: syclcc.json
         # post-24.02.0: acpp-core.json
-        config_file_paths = filesystem.find(
-            self.prefix, ("syclcc.json", "acpp-core.json")
+        # Check where the file is normally installed before searching the
+        # whole prefix.
+        config_file_names = ("syclcc.json", "acpp-core.json")
+        config_file_path = _probe_config_file(self.prefix, config_file_names)
+        if config_file_path is None:
+            found = _find_many(self.prefix, config_file_names)
+            config_file_paths = [
+                path.join(directory, name)
+                for name in config_file_names
+                for directory in found[name]
+            ]
+            if len(config_file_paths) != 1:
+                raise InstallError(
+                    "installed AdaptiveCPP must provide a unique compiler "
+                    "driver configuration file, found: {0}".format(config_file_paths)
+                )
+            config_file_path = config_file_paths[0]
+
+        # There may be a separate cuda config file. It is installed next to
+        # the core config when the release and backends provide one, so its
+        # absence there is final.
+        cuda_config_file_path = path.join(
+            path.dirname(config_file_path), "acpp-cuda.json"
         )
-        if len(config_file_paths) != 1:
-            raise InstallError(
-                "installed AdaptiveCPP must provide a unique compiler driver "
-                "configuration file, found: {0}".format(config_file_paths)
-            )
-        config_file_path = config_file_paths[0]
-        with open(config_file_path) as f:
-            config = json.load(f)
+        if not path.isfile(cuda_config_file_path):
+            cuda_config_file_path = None
+
+        config = _load_config(config_file_path)
+        # Only top level values are replaced below, so a shallow copy is
+        # enough to tell whether the file needs rewriting.
+        original_config = dict(config)
 
-        # There may be a separate cuda config file
         cuda_config = None
-        cuda_config_file_path = None
-        config_file_paths = filesystem.find(self.prefix, ("acpp-cuda.json",))
-        if len(config_file_paths) > 0:
-            cuda_config_file_path = config_file_paths[0]
-            with open(cuda_config_file_path) as f:
-                cuda_config = json.load(f)
+        if cuda_config_file_path is not None:
+            cuda_config = _load_config(cuda_config_file_path)
+            original_cuda_config = dict(cuda_config)
 
         # 1. Fix compiler: use the real one in place of the Spack wrapper
         config["default-cpu-cxx"] = self.compiler.cxx
@@ -256,62 +445,50 @@ class Adaptivecpp(CMakePackage):
         #    the libc++.so and libc++abi.so dyn linked to the sycl
         #    ptx backend
 
-        # Find the rpaths for cpp
-        rpaths = set()
-        if "llvm" in self.spec:
-            so_paths = filesystem.find(self.spec["llvm"].prefix, "libc++.so")
-            if len(so_paths) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide a "
-                    "unique directory containing libc++.so, "
-                    "found: {0}".format(so_paths)
-                )
-            rpaths.add(path.dirname(so_paths[0]))
-            so_paths = filesystem.find(self.spec["llvm"].prefix, "libc++abi.so")
-            if len(so_paths) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide a "
-                    "unique directory containing libc++abi.so, "
-                    "found: {0}".format(so_paths)
-                )
-            rpaths.add(path.dirname(so_paths[0]))
+        if has_llvm:
+            # Only look up the llvm libraries if there is a link line to
+            # add their rpaths to. The cuda link line lives in the separate
+            # cuda config file when there is one, and is only used when the
+            # cuda backend is built.
+            cuda_link_config = config if cuda_config is None else cuda_config
+            need_cuda_rpath = want_cuda and _CUDA_LINK_LINE in cuda_link_config
+            need_omp_rpath = _OMP_LINK_LINE in config
+
+            # Find the rpaths for cpp
+            rpaths = set()
+            if need_cuda_rpath or need_omp_rpath:
+                for so_name in ("libc++.so", "libc++abi.so"):
+                    rpaths.add(
+                        self._find_unique_llvm_dir(
+                            so_name, "directory containing " + so_name
+                        )
+                    )
 
-            # the omp llvm backend may link against the libomp.so in llvm
-            so_paths = filesystem.find(self.spec["llvm"].prefix, "libomp.so")
-            rpaths.add(path.dirname(so_paths[0]))
+            if need_omp_rpath:
+                # the omp llvm backend may link against the libomp.so in llvm,
+                # if llvm was built with openmp
+                libomp_dirs = self._llvm_index["libomp.so"]
+                if libomp_dirs:
+                    rpaths.add(libomp_dirs[0])
 
             # Add the rpaths for llvm c++
-            default_cuda_link_line = "default-cuda-link-line"
-            if cuda_config is not None:
-                if default_cuda_link_line in cuda_config.keys():
-                    cuda_config[default_cuda_link_line] += " " + " ".join(
-                        "-rpath {0}".format(p) for p in rpaths
-                    )
-            else:
-                if default_cuda_link_line in config.keys():
-                    config[default_cuda_link_line] += " " + " ".join(
-                        "-rpath {0}".format(p) for p in rpaths
-                    )
+            if need_cuda_rpath:
+                cuda_link_config[_CUDA_LINK_LINE] += _rpath_flags(rpaths, "-rpath")
 
             # add the rpaths for llvm omp
-            default_omp_link_line = "default-omp-link-line"
-            if default_omp_link_line in config.keys():
-                config[default_omp_link_line] += " " + " ".join(
-                    "-Wl,-rpath {0}".format(p) for p in rpaths
-                )
+            if need_omp_rpath:
+                config[_OMP_LINK_LINE] += _rpath_flags(rpaths, "-Wl,-rpath")
 
         else:
             # If llvm is not in the spec then explicitly use "omp.library-only"
             # as the default backend.
-            default_targets = "default-targets"
-            if default_targets in config.keys():
-                config[default_targets] = "omp.library-only"
+            if _DEFAULT_TARGETS in config:
+                config[_DEFAULT_TARGETS] = _LIBRARY_ONLY_TARGET
 
-        # Replace the installed config file
-        with open(config_file_path, "w") as f:
-            json.dump(config, f, indent=2)
+        # Replace the installed config file if anything changed
+        if config != original_config:
+            _write_config(config, config_file_path)
 
         # replace the cuda config if it exists
-        if cuda_config is not None:
-            with open(cuda_config_file_path, "w") as f:
-                json.dump(cuda_config, f, indent=2)
+        if cuda_config is not None and cuda_config != original_cuda_config:
+            _write_config(cuda_config, cuda_config_file_path)
@@ -4,9 +4,24 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 from spack import *
+import errno
 import os
 import shutil
 
+# os.link errors meaning the file can not be hard linked and must be copied:
+# across filesystems, unsupported by the filesystem, or too many links.
+_LINK_ERRNOS = frozenset((errno.EXDEV, errno.EPERM, errno.EMLINK))
+
+
+def _link_or_copy(src, dst):
+    """Hard link src to dst, copying it instead if it can not be linked."""
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno not in _LINK_ERRNOS:
+            raise
+        shutil.copy2(src, dst)
+
 
 class CmakeMovedBuild(CMakePackage):
     """Test cmake package"""
@@ -17,6 +32,8 @@ class CmakeMovedBuild(CMakePackage):
 
     version("0.0.1", commit="64e75fa0c6b5ac90f6b5c0c532155328ccf59c06")
 
+    generator("ninja")
+
     @property
     def build_directory(self):
         """Returns the directory to use when building the package
@@ -29,7 +46,11 @@ class CmakeMovedBuild(CMakePackage):
         self.copied_build_dir = os.path.join(prefix, "build_tree")
         src_path = os.path.join(self.stage.path, self.stage.source_path)
         dst_path = self.copied_build_dir
-        shutil.copytree(src_path, dst_path)
+        # Hard link the sources instead of copying their contents where the
+        # stage and the prefix share a filesystem. Linked files share their
+        # inode with the stage sources, so nothing may rewrite a file in the
+        # build tree in place; replace it with a new file instead.
+        shutil.copytree(src_path, dst_path, copy_function=_link_or_copy)
         CMakePackage.cmake(self, spec, prefix)
 
 
@@ -3,25 +3,36 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-# FIXME: Use os.path and builtin tools instead of pathlib
 from os import path
-from pathlib import Path
 
 from llnl.util import filesystem
 from spack import *
 
+# Library directories of the oneAPI install, relative to the oneAPI root and
+# to the compiler's root directory respectively
+_TBB_LIB_SUBDIR = ("tbb", "latest", "lib", "intel64", "gcc4.8")
+_COMPILER_LIB_SUBDIRS = (
+    ("lib",),
+    ("lib", "x64"),
+    ("lib", "oclfpga", "host", "linux64", "lib"),
+    ("compiler", "lib", "intel64_lin"),
+    ("lib", "emu"),
+    ("lib", "oclfpga", "linux64", "lib"),
+    ("compiler", "lib"),
+)
+
 
 def _get_pkg_versions(pkg_name):
     """Get a list of 'safe' (already checksummed) available versions of a Spack package
     Equivalent to 'spack versions <pkg_name>' on the command line"""
-    pkg_spec = spack.spec.Spec(pkg_name)
     spack_version = spack.spack_version_info
     if spack_version[1] <= 20:
         pkg_cls = spack.repo.path.get_pkg_class(pkg_name)
     else:
         pkg_cls = spack.repo.PATH.get_pkg_class(pkg_name)
-    pkg = pkg_cls(pkg_spec)
-    return [vkey.string for vkey in pkg.versions.keys()]
+    # The version directives fill in a class level dict, so there is no need
+    # to build a Spec and instantiate the package to read it.
+    return [vkey.string for vkey in pkg_cls.versions.keys()]
 
 
 def _restrict_to_version(versions, idx):
@@ -90,62 +101,69 @@ class Dpcpp(Package):
 
     @property
     def _compiler_dir(self):
-        return Path(self.compiler.cxx).parent
+        if getattr(self, "_compiler_dir_cache", None) is None:
+            self._compiler_dir_cache = path.dirname(self.compiler.cxx)
+        return self._compiler_dir_cache
 
     @property
     def _oneapi_root(self):
-        return self._compiler_dir.parent.parent.parent.parent
+        if getattr(self, "_oneapi_root_cache", None) is None:
+            root = self._compiler_dir
+            for _ in range(4):
+                root = path.dirname(root)
+            self._oneapi_root_cache = root
+        return self._oneapi_root_cache
 
     @property
     def cmake_prefix_paths(self):
-        return [str(self._compiler_dir.parent / "IntelDPCPP")]
+        return [path.join(path.dirname(self._compiler_dir), "IntelDPCPP")]
 
     @property
     def _library_paths(self):
-        return [
-            self._oneapi_root / "tbb" / "latest" / "lib" / "intel64" / "gcc4.8",
-            self._compiler_dir.parent / "lib",
-            self._compiler_dir.parent / "lib" / "x64",
-            self._compiler_dir.parent / "lib" / "oclfpga" / "host" / "linux64" / "lib",
-            self._compiler_dir.parent / "compiler" / "lib" / "intel64_lin",
-            self._compiler_dir.parent / "lib" / "emu",
-            self._compiler_dir.parent / "lib" / "oclfpga" / "linux64" / "lib",
-            self._compiler_dir.parent / "compiler" / "lib",
-        ]
+        # Cached, as the environment of every dependent is set up from these
+        if getattr(self, "_library_paths_cache", None) is None:
+            compiler_root = path.dirname(self._compiler_dir)
+            self._library_paths_cache = (
+                path.join(self._oneapi_root, *_TBB_LIB_SUBDIR),
+                *(path.join(compiler_root, *parts) for parts in _COMPILER_LIB_SUBDIRS),
+            )
+        return self._library_paths_cache
 
     @property
     def libs(self):
         libs = []
-        for path in self._library_paths:
-            libs += filesystem.find_libraries("*.so*", path)
+        for lib_path in self._library_paths:
+            libs += filesystem.find_libraries("*.so*", lib_path)
         return libs
 
     def install(self):
         pass
 
     def _setup_common_dependent_environment(self, env, dependent_spec):
-        env.set("ONEAPI_ROOT", str(self._oneapi_root))
-        env.append_path("PATH", str(self._compiler_dir))
+        env.set("ONEAPI_ROOT", self._oneapi_root)
+        env.append_path("PATH", self._compiler_dir)
         # Need to set this in order to allow DLOPEN to find backend
         # libraries at runtime. Hopefully later releases will render
         # this unnecessary (see
         # https://github.com/intel/llvm/blob/sycl/sycl/doc/design/PluginInterface.md#plugin-discovery).
-        for path in self._library_paths:
-            # env.append_flags("__INTEL_PRE_CFLAGS", f"-Wl,-rpath,{path}")
-            env.append_path("LD_LIBRARY_PATH", str(path))
+        for lib_path in self._library_paths:
+            # env.append_flags("__INTEL_PRE_CFLAGS", f"-Wl,-rpath,{lib_path}")
+            env.append_path("LD_LIBRARY_PATH", lib_path)
 
     def setup_dependent_build_environment(self, env, dependent_spec):
         self._setup_common_dependent_environment(env, dependent_spec)
+        compiler_root = path.dirname(self._compiler_dir)
         env.prepend_path(
             "PKG_CONFIG_PATH",
-            str(self._oneapi_root / "tbb" / "latest" / "lib" / "pkgconfig"),
+            path.join(self._oneapi_root, "tbb", "latest", "lib", "pkgconfig"),
         )
         env.prepend_path(
             "PKG_CONFIG_PATH",
-            str(self._compiler_dir.parent.parent / "lib" / "pkgconfig"),
+            path.join(path.dirname(compiler_root), "lib", "pkgconfig"),
         )
-        env.append_path("SYCL_INCLUDE_DIR_HINT", str(self._compiler_dir.parent))
-        env.append_path("SYCL_LIBRARY_DIR_HINT", str(self._compiler_dir.parent))
+        # The hints name a single directory rather than a search path
+        env.set("SYCL_INCLUDE_DIR_HINT", compiler_root)
+        env.set("SYCL_LIBRARY_DIR_HINT", compiler_root)
 
     def setup_dependent_run_environment(self, env, dependent_spec):
         # Not clear which of these I really need, or whether they should be run-time or build-time
@@ -3,13 +3,20 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-import json
-from os import path
 from glob import glob
+from itertools import islice
+from os import path
 
 from llnl.util import filesystem
 
 from spack import *
+from spack.pkg.neso.adaptivecpp import (
+    _find_many,
+    _find_nvcpp,
+    _load_config,
+    _scandir_find,
+    _write_config,
+)
 
 """
 Install nvc++ version with soemthing like
@@ -22,6 +29,41 @@ to avoid llvm build
 """
 
 
+# Files looked up under the llvm prefix by cmake_args and filter_config_file
+_LLVM_FILES = frozenset(
+    (
+        "LLVMExports.cmake",
+        "__clang_cuda_runtime_wrapper.h",
+        "libc++.so",
+        "libc++abi.so",
+    )
+)
+
+# Where llvm normally installs some of the files in _LLVM_FILES, relative to
+# its prefix. A single match here is used without walking the whole prefix.
+# libc++.so and libc++abi.so are deliberately absent: recent llvm releases
+# install them under a target-triple directory such as
+# lib/x86_64-unknown-linux-gnu, so their uniqueness has to be checked across
+# the whole prefix.
+_LLVM_FILE_DIRS = {
+    "LLVMExports.cmake": path.join("lib", "cmake", "llvm"),
+    "__clang_cuda_runtime_wrapper.h": path.join("lib", "clang", "*", "include"),
+}
+
+
+def _find_unique(root, name, msg):
+    """Return the only file called name below root. The search stops at a
+    second match; if there is not exactly one match an InstallError is
+    raised starting with msg."""
+    found = [
+        path.join(directory, found_name)
+        for directory, found_name in islice(_scandir_find(root, (name,)), 2)
+    ]
+    if len(found) != 1:
+        raise InstallError("{0}, found: {1}".format(msg, found))
+    return found[0]
+
+
 class Hipsycl(CMakePackage):
     """hipSYCL is an implementation of the SYCL standard programming model
     over NVIDIA CUDA/AMD HIP"""
@@ -94,16 +136,53 @@ class Hipsycl(CMakePackage):
         "https://github.com/illuhad/hipSYCL/blob/master/doc/install-cuda.md",
     )
 
+    @property
+    def _llvm_index(self):
+        """Map each of the files in _LLVM_FILES to the directories under the
+        llvm prefix that contain it.
+
+        The llvm install tree is large, so it is walked once and the result
+        is shared by cmake_args and filter_config_file.
+        """
+        if getattr(self, "_llvm_index_cache", None) is None:
+            self._llvm_index_cache = _find_many(self.spec["llvm"].prefix, _LLVM_FILES)
+        return self._llvm_index_cache
+
+    def _find_unique_llvm_dir(self, name, description):
+        """Return the only directory under the llvm prefix containing a file
+        called name, raising an InstallError if there is not exactly one.
+
+        For files listed in _LLVM_FILE_DIRS the usual install location is
+        checked first and wins if it holds exactly one match. Otherwise the
+        llvm prefix is walked and uniqueness checked across the whole of it.
+        """
+        if name in _LLVM_FILE_DIRS:
+            probed = glob(
+                path.join(self.spec["llvm"].prefix, _LLVM_FILE_DIRS[name], name)
+            )
+            if len(probed) == 1:
+                return path.dirname(probed[0])
+        found = self._llvm_index[name]
+        if len(found) != 1:
+            raise InstallError(
+                "concretized llvm dependency must provide a unique {0}, "
+                "found: {1}".format(description, found)
+            )
+        return found[0]
+
     def cmake_args(self):
 
         spec = self.spec
+        has_llvm = "llvm" in spec
+        want_nvcxx = "+nvcxx" in spec
+
         args = [
             "-DWITH_CPU_BACKEND:Bool=TRUE",
             # TODO: no ROCm stuff available in spack yet
             "-DWITH_ROCM_BACKEND:Bool=FALSE",
         ]
-        
-        if 'llvm' in spec:
+
+        if has_llvm:
             # prevent hipSYCL's cmake to look for other LLVM installations
             # if the specified one isn't compatible
             args += [
@@ -112,32 +191,17 @@ class Hipsycl(CMakePackage):
 
             # LLVM directory containing all installed CMake files
             # (e.g.: configs consumed by client projects)
-            llvm_cmake_dirs = filesystem.find(
-                spec["llvm"].prefix, "LLVMExports.cmake"
-            )
-            if len(llvm_cmake_dirs) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide "
-                    "a unique directory containing CMake client "
-                    "files, found: {0}".format(llvm_cmake_dirs)
-                )
-            args.append(
-                "-DLLVM_DIR:String={0}".format(path.dirname(llvm_cmake_dirs[0]))
+            llvm_cmake_dir = self._find_unique_llvm_dir(
+                "LLVMExports.cmake", "directory containing CMake client files"
             )
+            args.append("-DLLVM_DIR:String={0}".format(llvm_cmake_dir))
             # clang internal headers directory
-            llvm_clang_include_dirs = filesystem.find(
-                spec["llvm"].prefix, "__clang_cuda_runtime_wrapper.h"
+            llvm_clang_include_dir = self._find_unique_llvm_dir(
+                "__clang_cuda_runtime_wrapper.h",
+                "directory containing clang internal headers",
             )
-            if len(llvm_clang_include_dirs) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide a "
-                    "unique directory containing clang internal "
-                    "headers, found: {0}".format(llvm_clang_include_dirs)
-                )
             args.append(
-                "-DCLANG_INCLUDE_PATH:String={0}".format(
-                    path.dirname(llvm_clang_include_dirs[0])
-                )
+                "-DCLANG_INCLUDE_PATH:String={0}".format(llvm_clang_include_dir)
             )
             # target clang++ executable
             llvm_clang_bin = path.join(spec["llvm"].prefix.bin, "clang++")
@@ -157,7 +221,7 @@ class Hipsycl(CMakePackage):
                 "-DCMAKE_CXX_FLAGS=-fopenmp",
             ]
 
-        if ("+cuda" in spec) or ("+nvcxx" in spec):
+        if want_nvcxx or "+cuda" in spec:
             args += [
                 "-DCUDA_TOOLKIT_ROOT_DIR:String={0}".format(
                     spec["cuda"].prefix
@@ -169,22 +233,22 @@ class Hipsycl(CMakePackage):
                 "-DWITH_CUDA_BACKEND:Bool=FALSE",
             ]
 
-        if "+nvcxx" in spec:
-            nvcpp_cands = glob(path.join(spec["nvhpc"].prefix, "**/nvc++"), recursive=True)
-            if len(nvcpp_cands) < 1:
+        if want_nvcxx:
+            nvcpp = _find_nvcpp(spec["nvhpc"].prefix)
+            if nvcpp is None:
                 raise InstallError(
                     "Failed to find nvc++ executable"
                 )
             args.append(
-                "-DNVCXX_COMPILER={0}".format(nvcpp_cands[0])
+                "-DNVCXX_COMPILER={0}".format(nvcpp)
             )
 
-            if not ("llvm" in spec):
+            if not has_llvm:
                 args.append(
                     "-DWITH_CUDA_NVCXX_ONLY=ON"
                 )
 
-        if not ("llvm" in spec):
+        if not has_llvm:
             args += [
                 "-DWITH_ACCELERATED_CPU=OFF",
                 "-DBUILD_CLANG_PLUGIN=OFF",
@@ -195,15 +259,16 @@ class Hipsycl(CMakePackage):
     @run_after("install")
     def filter_config_file(self):
 
-        config_file_paths = filesystem.find(self.prefix, "syclcc.json")
-        if len(config_file_paths) != 1:
-            raise InstallError(
-                "installed hipSYCL must provide a unique compiler driver "
-                "configuration file, found: {0}".format(config_file_paths)
-            )
-        config_file_path = config_file_paths[0]
-        with open(config_file_path) as f:
-            config = json.load(f)
+        config_file_path = _find_unique(
+            self.prefix,
+            "syclcc.json",
+            "installed hipSYCL must provide a unique compiler driver "
+            "configuration file",
+        )
+        config = _load_config(config_file_path)
+        # Only top level values are replaced below, so a shallow copy is
+        # enough to tell whether the file needs rewriting.
+        original_config = dict(config)
         # 1. Fix compiler: use the real one in place of the Spack wrapper
         config["default-cpu-cxx"] = self.compiler.cxx
         # 2. Fix stdlib: we need to make sure cuda-enabled binaries find
@@ -212,26 +277,16 @@ class Hipsycl(CMakePackage):
 
         if "llvm" in self.spec:
             rpaths = set()
-            so_paths = filesystem.find(self.spec["llvm"].prefix, "libc++.so")
-            if len(so_paths) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide a "
-                    "unique directory containing libc++.so, "
-                    "found: {0}".format(so_paths)
-                )
-            rpaths.add(path.dirname(so_paths[0]))
-            so_paths = filesystem.find(self.spec["llvm"].prefix, "libc++abi.so")
-            if len(so_paths) != 1:
-                raise InstallError(
-                    "concretized llvm dependency must provide a "
-                    "unique directory containing libc++abi.so, "
-                    "found: {0}".format(so_paths)
+            for so_name in ("libc++.so", "libc++abi.so"):
+                rpaths.add(
+                    self._find_unique_llvm_dir(
+                        so_name, "directory containing " + so_name
+                    )
                 )
-            rpaths.add(path.dirname(so_paths[0]))
             config["default-cuda-link-line"] += " " + " ".join(
                 "-rpath {0}".format(p) for p in rpaths
             )
 
-        # Replace the installed config file
-        with open(config_file_path, "w") as f:
-            json.dump(config, f, indent=2)
+        # Replace the installed config file if anything changed
+        if config != original_config:
+            _write_config(config, config_file_path)
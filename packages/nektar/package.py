@@ -145,43 +145,47 @@ class Nektar(CMakePackage):
         "+hdf5", when="~mpi", msg="Nektar's hdf5 output is for parallel builds only"
     )
 
+    # CMake options that are switched on and off by a variant of the same
+    # meaning
+    _VARIANT_OPTIONS = (
+        ("NEKTAR_BUILD_DEMOS", "demos"),
+        ("NEKTAR_BUILD_PYTHON", "python"),
+        ("NEKTAR_SOLVER_ACOUSTIC", "acoustic_solver"),
+        ("NEKTAR_SOLVER_ADR", "adr_solver"),
+        ("NEKTAR_SOLVER_CARDIAC_EP", "cardiac_solver"),
+        ("NEKTAR_SOLVER_COMPRESSIBLE_FLOW", "compflow_solver"),
+        ("NEKTAR_SOLVER_DIFFUSION", "diff_solver"),
+        ("NEKTAR_SOLVER_DUMMY", "dummy_solver"),
+        ("NEKTAR_SOLVER_ELASTICITY", "elasticity_solver"),
+        ("NEKTAR_SOLVER_IMAGE_WARPING", "imgwarp_solver"),
+        ("NEKTAR_SOLVER_INCNAVIERSTOKES", "ins_solver"),
+        ("NEKTAR_SOLVER_MMF", "mmf_solver"),
+        ("NEKTAR_SOLVER_PULSEWAVE", "pulsewave_solver"),
+        ("NEKTAR_SOLVER_SHALLOW_WATER", "shwater_solver"),
+        ("NEKTAR_SOLVER_VORTEXWAVE", "vortexwave_solver"),
+        ("NEKTAR_USE_ARPACK", "arpack"),
+        ("NEKTAR_USE_FFTW", "fftw"),
+        ("NEKTAR_USE_HDF5", "hdf5"),
+        ("NEKTAR_USE_MPI", "mpi"),
+        ("NEKTAR_USE_SCOTCH", "scotch"),
+    )
+
     def cmake_args(self):
-        args = []
-
-        def hasfeature(feature):
-            return "ON" if feature in self.spec else "OFF"
-
-        args.append("-DNEKTAR_BUILD_DEMOS=%s" % hasfeature("+demos"))
-        args.append("-DNEKTAR_BUILD_PYTHON=%s" % hasfeature("+python"))
-        args.append("-DNEKTAR_BUILD_SOLVERS=ON")
-        args.append("-DNEKTAR_BUILD_SOLVER_LIBS=ON")
-        args.append("-DNEKTAR_BUILD_UTILITIES=ON")
-        args.append("-DNEKTAR_ERROR_ON_WARNINGS=OFF")
-        args.append("-DNEKTAR_SOLVER_ACOUSTIC=%s" % hasfeature("+acoustic_solver"))
-        args.append("-DNEKTAR_SOLVER_ADR=%s" % hasfeature("+adr_solver"))
-        args.append("-DNEKTAR_SOLVER_CARDIAC_EP=%s" % hasfeature("+cardiac_solver"))
-        args.append(
-            "-DNEKTAR_SOLVER_COMPRESSIBLE_FLOW=%s" % hasfeature("+compflow_solver")
-        )
-        args.append("-DNEKTAR_SOLVER_DIFFUSION=%s" % hasfeature("+diff_solver"))
-        args.append("-DNEKTAR_SOLVER_DUMMY=%s" % hasfeature("+dummy_solver"))
-        args.append("-DNEKTAR_SOLVER_ELASTICITY=%s" % hasfeature("+elasticity_solver"))
-        args.append("-DNEKTAR_SOLVER_IMAGE_WARPING=%s" % hasfeature("+imgwarp_solver"))
-        args.append("-DNEKTAR_SOLVER_INCNAVIERSTOKES=%s" % hasfeature("+ins_solver"))
-        args.append("-DNEKTAR_SOLVER_MMF=%s" % hasfeature("+mmf_solver"))
-        args.append("-DNEKTAR_SOLVER_PULSEWAVE=%s" % hasfeature("+pulsewave_solver"))
-        args.append("-DNEKTAR_SOLVER_SHALLOW_WATER=%s" % hasfeature("+shwater_solver"))
-        args.append("-DNEKTAR_SOLVER_VORTEXWAVE=%s" % hasfeature("+vortexwave_solver"))
-        args.append("-DNEKTAR_USE_ARPACK=%s" % hasfeature("+arpack"))
-        args.append("-DNEKTAR_USE_FFTW=%s" % hasfeature("+fftw"))
-        args.append("-DNEKTAR_USE_HDF5=%s" % hasfeature("+hdf5"))
-        args.append("-DNEKTAR_USE_MKL=%s" % hasfeature("^intel-oneapi-mkl"))
-        args.append("-DNEKTAR_USE_MPI=%s" % hasfeature("+mpi"))
-        args.append("-DNEKTAR_USE_OPENBLAS=%s" % hasfeature("^openblas"))
-        args.append("-DNEKTAR_USE_PETSC=OFF")
-        args.append("-DNEKTAR_USE_SCOTCH=%s" % hasfeature("+scotch"))
-        args.append("-DNEKTAR_USE_THREAD_SAFETY=ON")
-        return args
+        spec = self.spec
+        return [
+            *(
+                self.define_from_variant(option, variant)
+                for option, variant in self._VARIANT_OPTIONS
+            ),
+            "-DNEKTAR_BUILD_SOLVERS=ON",
+            "-DNEKTAR_BUILD_SOLVER_LIBS=ON",
+            "-DNEKTAR_BUILD_UTILITIES=ON",
+            "-DNEKTAR_ERROR_ON_WARNINGS=OFF",
+            self.define("NEKTAR_USE_MKL", "intel-oneapi-mkl" in spec),
+            self.define("NEKTAR_USE_OPENBLAS", "openblas" in spec),
+            "-DNEKTAR_USE_PETSC=OFF",
+            "-DNEKTAR_USE_THREAD_SAFETY=ON",
+        ]
 
     def install(self, spec, prefix):
         super(Nektar, self).install(spec, prefix)
@@ -200,16 +204,12 @@ class Nektar(CMakePackage):
                 python("setup.py", "install", "--prefix", prefix)
 
     def setup_run_environment(self, env):
+        prefix = self.spec.prefix
         env.append_path(
-            "CMAKE_PREFIX_PATH",
-            os.path.join(
-                self.spec.prefix,
-                os.path.join("lib64", os.path.join("nektar++", "cmake")),
-            ),
-        )
-        env.append_path(
-            "PYTHONPATH", os.path.abspath(os.path.join(self.spec.prefix, "build_tree"))
+            "CMAKE_PREFIX_PATH", os.path.join(prefix, "lib64", "nektar++", "cmake")
         )
+        # The install prefix is already absolute, so no abspath is needed
+        env.append_path("PYTHONPATH", os.path.join(prefix, "build_tree"))
 
     def setup_dependent_run_environment(self, env, dependent_spec):
         self.setup_run_environment(env)
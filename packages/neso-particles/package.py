@@ -1,6 +1,4 @@
 from spack import *
-import os
-import shutil
 
 
 class NesoParticles(CMakePackage):
@@ -39,10 +37,11 @@ class NesoParticles(CMakePackage):
     conflicts("+nvcxx", when="%oneapi", msg="Nvidia compilation option can only be used with gcc compilers")
 
     def cmake_args(self):
+        spec = self.spec
         args = []
-        if not "+build_tests" in self.spec:
+        if not spec.satisfies("+build_tests"):
             args.append("-DENABLE_NESO_PARTICLES_TESTS=off")
-        if "+nvcxx" in self.spec:
+        if spec.satisfies("+nvcxx"):
             args.append("-DNESO_PARTICLES_DEVICE_TYPE=GPU")
             args.append("-DHIPSYCL_TARGETS=cuda-nvcxx")
 
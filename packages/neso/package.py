@@ -10,19 +10,31 @@ import spack
 from warnings import warn
 
 
+# Values of the sanitizer variant other than "none"
+_SANITIZERS = ("address", "leak", "thread", "memory", "undefined_behaviour")
+
+# CMake flag enabling each of the sanitizers
+_SANITIZER_FLAGS = {
+    value: f"-DENABLE_SANITIZER_{value.upper()}=ON" for value in _SANITIZERS
+}
+
+# Sanitizers that can not be combined with the thread and memory sanitizers
+_THREAD_SANITIZER_CONFLICTS = frozenset(("address", "leak", "memory"))
+_MEMORY_SANITIZER_CONFLICTS = frozenset(("address", "leak"))
+
+
 def _validate_sanitizer_variant(pkg_name, variant_name, values):
     """Checks that the combination of sanitizer types is valid."""
+    values = frozenset(values)
     if "none" in values and len(values) > 1:
         raise SpecError(
             "sanitizer variant value 'none' can not be combined with any other values."
         )
-    if "thread" in values and (
-        "address" in values or "leak" in values or "memory" in values
-    ):
+    if "thread" in values and values & _THREAD_SANITIZER_CONFLICTS:
         raise SpecError(
             "'thread' sanitizer can not be combined with 'address', 'leak', or 'memory' sanitizers"
         )
-    if "memory" in values and ("address" in values or "leak" in values):
+    if "memory" in values and values & _MEMORY_SANITIZER_CONFLICTS:
         raise SpecError(
             "'memory' sanitizer can not be combined with 'address' or 'leak' sanitizers"
         )
@@ -31,14 +43,14 @@ def _validate_sanitizer_variant(pkg_name, variant_name, values):
 def _get_pkg_versions(pkg_name):
     """Get a list of 'safe' (already checksummed) available versions of a Spack package
     Equivalent to 'spack versions <pkg_name>' on the command line"""
-    pkg_spec = spack.spec.Spec(pkg_name)
     spack_version = spack.spack_version_info
     if spack_version[1] <= 20:
         pkg_cls = spack.repo.path.get_pkg_class(pkg_name)
     else:
         pkg_cls = spack.repo.PATH.get_pkg_class(pkg_name)
-    pkg = pkg_cls(pkg_spec)
-    return [vkey.string for vkey in pkg.versions.keys()]
+    # The version directives fill in a class level dict, so there is no need
+    # to build a Spec and instantiate the package to read it.
+    return [vkey.string for vkey in pkg_cls.versions.keys()]
 
 
 def _restrict_to_version(versions, idx):
@@ -73,7 +85,7 @@ class Neso(CMakePackage):
     variant(
         "sanitizer",
         description="The sanitizers to compile with",
-        values=("none", "address", "leak", "thread", "memory", "undefined_behaviour"),
+        values=("none",) + _SANITIZERS,
         default="none",
         multi=True,
         validator=_validate_sanitizer_variant,
@@ -120,9 +132,11 @@ class Neso(CMakePackage):
             self.define_from_variant("ENABLE_COVERAGE", "coverage"),
         ]
 
-        for value in self.spec.variants["sanitizer"].value:
-            if value != "none":
-                args.append(f"-DENABLE_SANITIZER_{value.upper()}=ON")
+        args.extend(
+            _SANITIZER_FLAGS[value]
+            for value in self.spec.variants["sanitizer"].value
+            if value != "none"
+        )
         if "intel" in self.spec["mpi"].name:
             if "I_MPI_FABRICS" not in environ:
                 warn(
@@ -130,17 +144,12 @@ class Neso(CMakePackage):
                     UserWarning,
                     stacklevel=1,
                 )
-        for depspec in self.spec.dependencies():
-            for dep in depspec.dependents():
-                if "sycl" in dep:
-                    if "SYCL_DEVICE_FILTER" not in environ:
-                        warn(
-                            "The environment variable SYCL_DEVICE_FILTER is not set and the code may not run as intended in this environment. A sensible default for running on the cpu is `export SYCL_DEVICE_FILTER=host`. For more information please see e.g. https://tinyurl.com/y37672as.",
-                            UserWarning,
-                            stacklevel=1,
-                        )
-
-                    break
+        if "sycl" in self.spec and "SYCL_DEVICE_FILTER" not in environ:
+            warn(
+                "The environment variable SYCL_DEVICE_FILTER is not set and the code may not run as intended in this environment. A sensible default for running on the cpu is `export SYCL_DEVICE_FILTER=host`. For more information please see e.g. https://tinyurl.com/y37672as.",
+                UserWarning,
+                stacklevel=1,
+            )
 
         if "+nvcxx" in self.spec:
             args.append("-DHIPSYCL_TARGETS=cuda-nvcxx")